@@ -0,0 +1,338 @@
+"""
+Anamnesis Trace Analyzer Tests
+
+Run with: python -m pytest tests/test_analyze_traces.py
+"""
+
+import os
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tools'))
+import analyze_traces as at  # noqa: E402
+
+requires_numba = pytest.mark.skipif(at.numba is None,
+                                    reason='numba not installed')
+
+
+def make_records(num_entries, max_slot, seed=0):
+    rng = np.random.default_rng(seed)
+    records = np.zeros(num_entries, dtype=at.TRACE_DTYPE)
+    records['slot'] = rng.integers(0, max_slot, num_entries)
+    records['op_type'] = rng.integers(0, at.OP_VALIDATION_FAIL + 1, num_entries)
+    return records
+
+
+def make_trace(num_entries, max_slot, seed=0):
+    return at.Trace.from_records(make_records(num_entries, max_slot, seed))
+
+
+def write_traces(trace_dir, record_arrays):
+    for i, records in enumerate(record_arrays):
+        records.tofile(trace_dir / f'trace_thread_{i:03d}.bin')
+
+
+def scan_range(range_fn, trace, num_slots, slot_arg):
+    op_counts = np.zeros(at.NUM_OP_CODES, at.COUNT_DTYPE)
+    slot_counts = np.zeros(num_slots, at.COUNT_DTYPE)
+    overflow = range_fn(trace.op_type, trace.slot, 0, trace.size, slot_arg,
+                        op_counts, slot_counts)
+    return op_counts, slot_counts, overflow
+
+
+@requires_numba
+def test_kernels_are_compiled():
+    from numba.core.dispatcher import Dispatcher
+    for kernel in (at._scan_range, at._scan_range_pow2, at._scan_kernel,
+                   at._scan_kernel_parallel):
+        assert isinstance(kernel, Dispatcher)
+
+
+def test_pow2_mask_matches_range_check_in_range():
+    trace = make_trace(5000, 1024)
+    masked = scan_range(at._scan_range_pow2, trace, 1024, 1023)
+    checked = scan_range(at._scan_range, trace, 1024, 1024)
+    assert np.array_equal(masked[0], checked[0])
+    assert np.array_equal(masked[1], checked[1])
+    assert not masked[2]
+    assert checked[2] == 0
+
+
+def test_range_kernels_report_out_of_range_slots():
+    trace = make_trace(5000, 2048)
+    alloc_slots = trace.slot[trace.op_type == at.OP_ALLOC]
+    assert scan_range(at._scan_range_pow2, trace, 1024, 1023)[2]
+    dropped = scan_range(at._scan_range, trace, 1000, 1000)[2]
+    assert dropped == np.count_nonzero(alloc_slots >= 1000)
+
+
+@requires_numba
+def test_serial_kernel_flags_overflow():
+    in_range = make_trace(5000, 1000)
+    wide = make_trace(5000, 2048)
+    for num_slots in (1000, 1024):
+        _, _, overflow = at._scan_kernel(in_range.op_type, in_range.slot,
+                                         num_slots)
+        assert overflow == 0
+        _, _, overflow = at._scan_kernel(wide.op_type, wide.slot, num_slots)
+        assert overflow != 0
+
+
+@requires_numba
+@pytest.mark.parametrize('num_entries,nchunks', [(1001, 8), (7, 16), (0, 4)])
+@pytest.mark.parametrize('num_slots', [1000, 1024])
+def test_parallel_kernel_matches_numpy(num_entries, nchunks, num_slots):
+    trace = make_trace(num_entries, num_slots)
+    op_counts, slot_counts, overflow = at._scan_kernel_parallel(
+        trace.op_type, trace.slot, num_slots, nchunks)
+    ref_ops, ref_slots = at._scan_numpy(trace.op_type, trace.slot, num_slots)
+    assert op_counts.shape[0] == nchunks
+    assert not overflow.any()
+    assert np.array_equal(op_counts.sum(axis=0), ref_ops)
+    assert np.array_equal(slot_counts[:, :num_slots].sum(axis=0), ref_slots)
+    assert not slot_counts[:, num_slots:].any()
+
+
+@requires_numba
+def test_scan_traces_parallel_path(monkeypatch):
+    monkeypatch.setattr(at, 'PARALLEL_SCAN_MIN', 0)
+    for max_slot, num_slots in ((1000, 1000), (2048, 1024)):
+        trace = make_trace(5003, max_slot)
+        op_counts, slot_counts = at.scan_traces(trace, num_slots)
+        ref_ops, ref_slots = at._scan_numpy(trace.op_type, trace.slot,
+                                            num_slots)
+        assert np.array_equal(op_counts, ref_ops)
+        assert np.array_equal(slot_counts, ref_slots)
+
+
+def test_scan_traces_matches_numpy_in_range():
+    trace = make_trace(5000, 1024)
+    for num_slots in (1024, 1500):
+        op_counts, slot_counts = at.scan_traces(trace, num_slots)
+        ref_ops, ref_slots = at._scan_numpy(trace.op_type, trace.slot, num_slots)
+        assert np.array_equal(op_counts, ref_ops)
+        assert np.array_equal(slot_counts, ref_slots)
+
+
+def test_out_of_range_slots_are_counted_unmasked():
+    # Slots up to 2047 against a power-of-two --num-slots: masking would
+    # fold them onto valid slots, a range check would drop them
+    trace = make_trace(5000, 2048)
+    _, slot_counts = at.scan_traces(trace, 1024)
+    alloc_slots = trace.slot[trace.op_type == at.OP_ALLOC]
+    assert np.array_equal(slot_counts, np.bincount(alloc_slots, minlength=1024))
+
+
+def test_scan_trace_files_grows_for_out_of_range_slots():
+    traces = [make_trace(5000, 1024, seed=1), make_trace(5000, 2048, seed=2)]
+    _, slot_counts = at.scan_trace_files(traces, 1024)
+    alloc_slots = np.concatenate(
+        [t.slot[t.op_type == at.OP_ALLOC] for t in traces])
+    assert np.array_equal(slot_counts, np.bincount(alloc_slots, minlength=1024))
+
+
+
+def test_scan_trace_files_prefetches_mapped_files(tmp_path):
+    record_arrays = [make_records(5000, 1024, seed) for seed in range(3)]
+    write_traces(tmp_path, record_arrays)
+    mapped = at.load_traces(tmp_path)
+    assert all(isinstance(t.slot.base, np.memmap) for t in mapped)
+    op_counts, slot_counts = at.scan_trace_files(mapped, 1024)
+    ref_ops, ref_slots = at.scan_trace_files(
+        [at.Trace.from_records(r) for r in record_arrays], 1024)
+    assert np.array_equal(op_counts, ref_ops)
+    assert np.array_equal(slot_counts, ref_slots)
+
+
+@pytest.fixture
+def trace_dir(tmp_path):
+    write_traces(tmp_path, [make_records(5000, 1024, seed) for seed in range(2)])
+    return tmp_path
+
+
+def summarize(trace_dir, num_slots=1024):
+    at.compute_dir_summary.cache_clear()
+    return at.compute_dir_summary(trace_dir, num_slots)
+
+
+def forbid_rescan(monkeypatch):
+    def load_traces(*args, **kwargs):
+        raise AssertionError('cache miss')
+    monkeypatch.setattr(at, 'load_traces', load_traces)
+
+
+def test_dir_summary_cache_hit(trace_dir, monkeypatch):
+    entropy, op_counts = summarize(trace_dir)
+    assert not op_counts.flags.writeable
+    assert (trace_dir / at.CACHE_FILENAME).exists()
+    assert not list(trace_dir.glob('*.tmp'))
+
+    forbid_rescan(monkeypatch)
+    cached_entropy, cached_op_counts = summarize(trace_dir)
+    assert cached_entropy == entropy
+    assert np.array_equal(cached_op_counts, op_counts)
+    assert not cached_op_counts.flags.writeable
+
+
+@pytest.mark.parametrize('change', ['size', 'mtime', 'num_slots', 'version'])
+def test_dir_summary_cache_invalidation(trace_dir, monkeypatch, change):
+    summarize(trace_dir)
+    num_slots = 1024
+    trace_file = trace_dir / 'trace_thread_000.bin'
+    if change == 'size':
+        with open(trace_file, 'ab') as f:
+            make_records(10, 1024).tofile(f)
+    elif change == 'mtime':
+        st = trace_file.stat()
+        os.utime(trace_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    elif change == 'num_slots':
+        num_slots = 1000
+    else:
+        monkeypatch.setattr(at, 'CACHE_VERSION', at.CACHE_VERSION + 1)
+
+    rescans = []
+    real_load_traces = at.load_traces
+
+    def load_traces(*args, **kwargs):
+        rescans.append(args)
+        return real_load_traces(*args, **kwargs)
+    monkeypatch.setattr(at, 'load_traces', load_traces)
+    summarize(trace_dir, num_slots)
+    assert rescans
+
+
+def test_dir_summary_ignores_corrupt_cache(trace_dir):
+    expected = summarize(trace_dir)
+    (trace_dir / at.CACHE_FILENAME).write_bytes(b'not an npz file')
+    entropy, op_counts = summarize(trace_dir)
+    assert entropy == expected[0]
+    assert np.array_equal(op_counts, expected[1])
+
+
+def test_dir_summary_rejects_pickled_cache(trace_dir):
+    expected = summarize(trace_dir)
+    cache_file = trace_dir / at.CACHE_FILENAME
+    with np.load(cache_file) as cached:
+        fields = dict(cached)
+    # An object array can only be loaded by unpickling it
+    fields['key'] = np.array([str(fields['key'])], dtype=object)
+    with open(cache_file, 'wb') as f:
+        np.savez(f, **fields)
+    with np.load(cache_file, allow_pickle=False) as cached:
+        with pytest.raises(ValueError):
+            cached['key']
+
+    entropy, op_counts = summarize(trace_dir)
+    assert entropy == expected[0]
+    assert np.array_equal(op_counts, expected[1])
+    # The rescan replaced the pickled cache with a plain one
+    with np.load(cache_file, allow_pickle=False) as cached:
+        assert cached['key'].dtype != object
+
+
+def test_empty_trace_size():
+    trace = at.Trace.from_records(np.empty(0, dtype=at.TRACE_DTYPE))
+    assert trace.size == 0
+    assert len(trace) == len(at.Trace._fields)
+
+
+def test_merge_traces_concatenates_in_file_order(tmp_path):
+    record_arrays = [make_records(100, 1024, seed) for seed in range(3)]
+    write_traces(tmp_path, record_arrays)
+    merged = at.merge_traces(tmp_path)
+    expected = np.concatenate(record_arrays)
+    assert merged.size == expected.size
+    for name in at.Trace._fields:
+        assert np.array_equal(getattr(merged, name), expected[name])
+
+
+def test_merge_traces_sort_is_stable_by_timestamp(tmp_path):
+    record_arrays = []
+    for thread in range(3):
+        records = make_records(100, 1024, seed=thread)
+        # Few distinct timestamps, so ties across files are common
+        records['timestamp'] = np.sort(
+            np.random.default_rng(thread).integers(0, 20, 100))
+        records['thread_id'] = thread
+        records['generation'] = np.arange(100)
+        record_arrays.append(records)
+    write_traces(tmp_path, record_arrays)
+
+    merged = at.merge_traces(tmp_path, sort=True)
+    expected = np.concatenate(record_arrays)
+    expected = expected[np.argsort(expected['timestamp'], kind='stable')]
+    assert np.all(np.diff(merged.timestamp.astype(np.int64)) >= 0)
+    for name in at.Trace._fields:
+        assert np.array_equal(getattr(merged, name), expected[name])
+
+
+def test_merge_traces_empty_dir(tmp_path):
+    merged = at.merge_traces(tmp_path)
+    assert merged.size == 0
+
+
+def test_merged_trace_wrappers_match_per_file_scan(tmp_path):
+    record_arrays = [make_records(1000, 1000, seed) for seed in range(2)]
+    write_traces(tmp_path, record_arrays)
+    merged = at.merge_traces(tmp_path)
+    op_counts, slot_counts = at.scan_trace_files(at.load_traces(tmp_path), 1000)
+    assert at.compute_reuse_entropy(merged, 1000) == pytest.approx(
+        at.entropy_from_slot_counts(slot_counts, 1000))
+    assert at.analyze_operation_stats(merged) == at.stats_from_op_counts(op_counts)
+
+
+def test_stale_scan_ext_is_rejected():
+    from types import SimpleNamespace
+    itemsize = np.dtype(at.COUNT_DTYPE).itemsize
+
+    def ext(version, width):
+        return SimpleNamespace(kernel_version=lambda: version,
+                               count_itemsize=lambda: width)
+    assert at._is_current_scan_ext(ext(at.SCAN_KERNEL_VERSION, itemsize))
+    assert not at._is_current_scan_ext(ext(at.SCAN_KERNEL_VERSION - 1, itemsize))
+    assert not at._is_current_scan_ext(ext(at.SCAN_KERNEL_VERSION, itemsize * 2))
+    assert not at._is_current_scan_ext(
+        SimpleNamespace(kernel_version=lambda: at.SCAN_KERNEL_VERSION))
+
+
+@pytest.mark.skipif(at.liburing is None, reason='liburing not installed')
+def test_uring_reads_match_mmap(tmp_path, monkeypatch, capsys):
+    # Several reads per file, a chunk that is not a whole number of
+    # records, and more reads than the queue depth
+    monkeypatch.setattr(at, 'URING_READ_CHUNK', 1000)
+    monkeypatch.setattr(at, 'URING_QUEUE_DEPTH', 4)
+    record_arrays = [make_records(n, 1024, seed)
+                     for seed, n in enumerate((2000, 0, 63))]
+    write_traces(tmp_path, record_arrays)
+    with open(tmp_path / 'trace_thread_002.bin', 'ab') as f:
+        f.write(b'\0' * 5)  # torn trailing record
+
+    trace_files = sorted(tmp_path.glob('trace_thread_*.bin'))
+    read = at._read_trace_files_uring(trace_files)
+    assert len(read) == len(trace_files)
+    for trace_file, trace in zip(trace_files, read):
+        mapped = at.load_trace_file(trace_file)
+        for name in at.Trace._fields:
+            assert np.array_equal(getattr(trace, name), getattr(mapped, name))
+    assert 'short read' not in capsys.readouterr().err
+
+
+@pytest.mark.skipif(at.liburing is None, reason='liburing not installed')
+def test_uring_short_read_warns(tmp_path, monkeypatch, capsys):
+    from types import SimpleNamespace
+    records = make_records(100, 1024)
+    write_traces(tmp_path, [records])
+    trace_file = tmp_path / 'trace_thread_000.bin'
+
+    # The file shrinks between fstat and the read
+    real_size = trace_file.stat().st_size
+    monkeypatch.setattr(at.os, 'fstat',
+                        lambda fd: SimpleNamespace(st_size=real_size + 64))
+    trace, = at._read_trace_files_uring([trace_file])
+    monkeypatch.undo()
+
+    assert np.array_equal(trace.slot, records['slot'])
+    assert 'short read' in capsys.readouterr().err
@@ -19,14 +19,52 @@ Example:
 import struct
 import numpy as np
 from pathlib import Path
-from collections import Counter, defaultdict
+from typing import NamedTuple
+from collections import defaultdict
 import argparse
+import functools
+import json
+import mmap
+import os
 import sys
+import tempfile
+import zipfile
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+try:
+    # Native build of the serial scan kernel (see build_scan_ext.py)
+    import anamnesis_scan
+except ImportError:
+    anamnesis_scan = None
 
 # Trace entry format (must match anamnesis_trace.h)
 TRACE_ENTRY_FORMAT = '<QIHBB'  # timestamp, slot, gen, op_type, thread_id
 TRACE_ENTRY_SIZE = struct.calcsize(TRACE_ENTRY_FORMAT)
 
+# Same layout as a NumPy structured dtype, so whole files decode in one read
+TRACE_DTYPE = np.dtype([
+    ('timestamp', '<u8'),
+    ('slot', '<u4'),
+    ('generation', '<u2'),
+    ('op_type', 'u1'),
+    ('thread_id', 'u1'),
+], align=False)
+assert TRACE_DTYPE.itemsize == TRACE_ENTRY_SIZE
+
 # Operation types (must match anamnesis_trace.h)
 OP_ALLOC = 0
 OP_RELEASE = 1
@@ -34,6 +72,51 @@ OP_GET_VALID = 2
 OP_GET_STALE = 3
 OP_VALIDATION_FAIL = 4
 
+# op_type is stored as a uint8, so any byte value is a valid histogram index
+NUM_OP_CODES = 256
+
+# Per-directory analysis cache, written next to the trace files. Bump
+# CACHE_VERSION whenever scan or entropy semantics change, so caches written
+# by older versions of this tool are ignored.
+CACHE_FILENAME = '.anamnesis_cache.npz'
+CACHE_VERSION = 1
+
+# Histogram bin type for scans. int32 halves the memory traffic of int64
+# bins; a single trace with 2**31 or more of any op or allocations of any
+# one slot would overflow it, so switch this to np.int64 for such traces.
+COUNT_DTYPE = np.int32
+
+# Readahead requested for the next trace file while the current one is
+# scanned; bounded so traces larger than RAM don't evict each other
+PREFETCH_BYTES = 1 << 28
+
+# io_uring reads: bounded submission batch, and a per-read size cap that
+# stays under the kernel's ~2 GiB single-read limit
+URING_QUEUE_DEPTH = 256
+URING_READ_CHUNK = 1 << 30
+
+# Below this many entries, thread startup outweighs a parallel scan
+PARALLEL_SCAN_MIN = 1 << 20
+
+# Bump whenever the scan kernels change; build_scan_ext.py compiles this
+# into the native module so that a stale build is detected and ignored
+SCAN_KERNEL_VERSION = 2
+
+
+def _is_current_scan_ext(module):
+    """Whether a built scan module matches these kernels and COUNT_DTYPE."""
+    kernel_version = getattr(module, 'kernel_version', None)
+    count_itemsize = getattr(module, 'count_itemsize', None)
+    return (kernel_version is not None and count_itemsize is not None
+            and kernel_version() == SCAN_KERNEL_VERSION
+            and count_itemsize() == np.dtype(COUNT_DTYPE).itemsize)
+
+
+if anamnesis_scan is not None and not _is_current_scan_ext(anamnesis_scan):
+    print("Warning: ignoring stale anamnesis_scan extension "
+          "(rebuild with tools/build_scan_ext.py)", file=sys.stderr)
+    anamnesis_scan = None
+
 OP_NAMES = {
     OP_ALLOC: 'alloc',
     OP_RELEASE: 'release',
@@ -43,29 +126,130 @@ OP_NAMES = {
 }
 
 
-def load_trace_file(filename):
-    """Load binary trace file into list of entries."""
-    entries = []
-    with open(filename, 'rb') as f:
-        while True:
-            data = f.read(TRACE_ENTRY_SIZE)
-            if not data:
-                break
-            entry = struct.unpack(TRACE_ENTRY_FORMAT, data)
-            entries.append({
-                'timestamp': entry[0],
-                'slot': entry[1],
-                'generation': entry[2],
-                'op_type': entry[3],
-                'thread_id': entry[4]
-            })
-    return entries
+class Trace(NamedTuple):
+    """
+    Trace entries stored column-wise, one array per field.
+
+    Being a tuple of columns, len(trace) is the field count and an empty
+    Trace is still truthy; use trace.size for the number of entries.
+    """
+    timestamp: np.ndarray
+    slot: np.ndarray
+    generation: np.ndarray
+    op_type: np.ndarray
+    thread_id: np.ndarray
+
+    @classmethod
+    def from_records(cls, records):
+        """Split a TRACE_DTYPE structured array into column views."""
+        return cls(*(records[name] for name in cls._fields))
 
+    @property
+    def size(self):
+        """Number of entries."""
+        return self.timestamp.size
 
-def merge_traces(trace_dir):
-    """Merge all per-thread traces and sort by timestamp."""
+
+def load_trace_file(filename):
+    """Memory-map binary trace file as read-only Trace columns."""
+    num_entries = Path(filename).stat().st_size // TRACE_DTYPE.itemsize
+    if num_entries == 0:
+        # mmap cannot map an empty file
+        return Trace.from_records(np.empty(0, dtype=TRACE_DTYPE))
+    # Explicit shape drops a torn trailing record instead of failing
+    records = np.memmap(filename, dtype=TRACE_DTYPE, mode='r',
+                        shape=(num_entries,))
+    return Trace.from_records(records)
+
+
+def _prefetch_trace(trace):
+    """Ask the kernel to start reading in the head of a mapped trace."""
+    buf = trace.slot
+    while isinstance(buf, np.ndarray):
+        buf = buf.base
+    # Only file-backed traces; io_uring reads are already in memory
+    if isinstance(buf, mmap.mmap) and hasattr(mmap, 'MADV_WILLNEED'):
+        buf.madvise(mmap.MADV_WILLNEED, 0, min(len(buf), PREFETCH_BYTES))
+
+
+def _read_trace_files_uring(trace_files):
+    """Read whole trace files into memory with batched io_uring reads."""
+    itemsize = TRACE_DTYPE.itemsize
+    # Whole records per read, so every chunk decodes on its own
+    read_chunk = max(URING_READ_CHUNK // itemsize, 1) * itemsize
+    fds = []
+    requests = []  # (fd, offset, buffer) per read, in file order
+    trace_chunks = []  # request indices belonging to each file
+    try:
+        for filename in trace_files:
+            fd = os.open(filename, os.O_RDONLY)
+            fds.append(fd)
+            size = os.fstat(fd).st_size
+            size -= size % itemsize
+            chunks = []
+            for offset in range(0, size, read_chunk):
+                chunks.append(len(requests))
+                length = min(read_chunk, size - offset)
+                requests.append((fd, offset, bytearray(length)))
+            trace_chunks.append(chunks)
+
+        nread = [0] * len(requests)
+        if requests:
+            depth = min(len(requests), URING_QUEUE_DEPTH)
+            ring = liburing.Ring()
+            cqe = liburing.Cqe()
+            liburing.io_uring_queue_init(depth, ring, 0)
+            try:
+                for start in range(0, len(requests), depth):
+                    batch = range(start, min(start + depth, len(requests)))
+                    for i in batch:
+                        fd, offset, buf = requests[i]
+                        sqe = liburing.io_uring_get_sqe(ring)
+                        liburing.io_uring_prep_read(sqe, fd, buf, offset)
+                        liburing.io_uring_sqe_set_data64(sqe, i)
+                    # One syscall submits the whole batch and waits for it
+                    liburing.io_uring_submit_and_wait(ring, len(batch))
+                    for _ in batch:
+                        liburing.io_uring_wait_cqe(ring, cqe)
+                        i = liburing.io_uring_cqe_get_data64(cqe[0])
+                        nread[i] = liburing.trap_error(cqe[0].res)
+                        liburing.io_uring_cqe_seen(ring, cqe[0])
+            finally:
+                liburing.io_uring_queue_exit(ring)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+    traces = []
+    for filename, chunks in zip(trace_files, trace_chunks):
+        expected = sum(len(requests[i][2]) for i in chunks)
+        got = sum(nread[i] for i in chunks)
+        if got < expected:
+            # File truncated underneath us: keep the whole records read
+            print(f"Warning: short read of {filename}: {got:,} of "
+                  f"{expected:,} bytes, keeping {got // itemsize:,} entries",
+                  file=sys.stderr)
+        arrays = [np.frombuffer(requests[i][2], dtype=TRACE_DTYPE,
+                                count=nread[i] // itemsize)
+                  for i in chunks]
+        if not arrays:
+            records = np.empty(0, dtype=TRACE_DTYPE)
+        elif len(arrays) == 1:
+            records = arrays[0]
+        else:
+            records = np.concatenate(arrays)
+        traces.append(Trace.from_records(records))
+    return traces
+
+
+def load_traces(trace_dir, io_uring=False):
+    """
+    Map all per-thread traces in a directory without merging them.
+
+    With io_uring=True (Linux, requires the liburing package), the files
+    are instead read into memory with batched io_uring submissions.
+    """
     trace_dir = Path(trace_dir)
-    all_entries = []
 
     trace_files = sorted(trace_dir.glob('trace_thread_*.bin'))
     if not trace_files:
@@ -73,23 +257,214 @@ def merge_traces(trace_dir):
         return []
 
     print(f"Loading {len(trace_files)} trace files...")
-    for trace_file in trace_files:
-        entries = load_trace_file(trace_file)
-        all_entries.extend(entries)
-        print(f"  {trace_file.name}: {len(entries):,} entries")
+    if io_uring and liburing is None:
+        print("Warning: liburing not available, falling back to mmap",
+              file=sys.stderr)
+        io_uring = False
+
+    if io_uring:
+        traces = _read_trace_files_uring(trace_files)
+    else:
+        # Mapping does no I/O; pages are read in as the scan touches them
+        traces = [load_trace_file(f) for f in trace_files]
+    for trace_file, trace in zip(trace_files, traces):
+        print(f"  {trace_file.name}: {trace.size:,} entries")
 
-    # Sort by timestamp
-    print("Sorting entries by timestamp...")
-    all_entries.sort(key=lambda e: e['timestamp'])
+    return traces
 
-    return all_entries
 
+def merge_traces(trace_dir, sort=False):
+    """
+    Merge all per-thread traces into one Trace of contiguous columns.
 
-def compute_reuse_entropy(entries, num_slots):
+    Entropy and operation stats are order-insensitive, so entries are left
+    in file order by default. Pass sort=True for temporal analysis that
+    needs a global timestamp order.
+    """
+    traces = load_traces(trace_dir)
+    if not traces:
+        return Trace.from_records(np.empty(0, dtype=TRACE_DTYPE))
+    merged = Trace(*(np.concatenate(columns) for columns in zip(*traces)))
+
+    if sort:
+        # Stable, so per-thread order survives timestamp ties
+        print("Sorting entries by timestamp...")
+        order = np.argsort(merged.timestamp, kind='stable')
+        merged = Trace(*(column[order] for column in merged))
+
+    return merged
+
+
+def _scan_range(op_type, slot, start, end, num_slots, op_counts, slot_counts):
+    """
+    Add entries [start, end) to the op and slot histograms.
+
+    Returns the number of allocations of slots at or beyond num_slots,
+    which are left out of slot_counts.
+    """
+    dropped = 0
+    for i in range(start, end):
+        o = op_type[i]
+        op_counts[o] += 1
+        if o == OP_ALLOC:
+            s = slot[i]
+            if s < num_slots:
+                slot_counts[s] += 1
+            else:
+                dropped += 1
+    return dropped
+
+
+def _scan_range_pow2(op_type, slot, start, end, slot_mask, op_counts,
+                     slot_counts):
+    """
+    _scan_range for power-of-two slot counts: masks instead of range checks.
+
+    Returns True if any allocated slot lay beyond slot_mask, in which case
+    slot_counts is wrong (that slot was folded onto a valid one).
+    """
+    stray = False
+    for i in range(start, end):
+        o = op_type[i]
+        op_counts[o] += 1
+        if o == OP_ALLOC:
+            s = slot[i]
+            stray |= s > slot_mask
+            slot_counts[s & slot_mask] += 1
+    return stray
+
+
+def _is_pow2(n):
+    """True if n is a positive power of two."""
+    return n > 0 and (n & (n - 1)) == 0
+
+
+def _scan_kernel(op_type, slot, num_slots):
+    """
+    Histogram op types and allocated slots in a single pass.
+
+    The third result is nonzero if any allocation used a slot at or beyond
+    num_slots; slot_counts must then be discarded.
+    """
+    op_counts = np.zeros(NUM_OP_CODES, COUNT_DTYPE)
+    slot_counts = np.zeros(num_slots, COUNT_DTYPE)
+    if _is_pow2(num_slots):
+        stray = _scan_range_pow2(op_type, slot, 0, op_type.size,
+                                 num_slots - 1, op_counts, slot_counts)
+        overflow = 1 if stray else 0
+    else:
+        overflow = _scan_range(op_type, slot, 0, op_type.size, num_slots,
+                               op_counts, slot_counts)
+    return op_counts, slot_counts, overflow
+
+
+if numba is not None:
+    _scan_range = numba.njit(cache=True, nogil=True)(_scan_range)
+    _scan_range_pow2 = numba.njit(cache=True, nogil=True)(_scan_range_pow2)
+    _is_pow2 = numba.njit(cache=True)(_is_pow2)
+    _scan_kernel = numba.njit(cache=True, nogil=True)(_scan_kernel)
+
+    @numba.njit(parallel=True, cache=True)
+    def _scan_kernel_parallel(op_type, slot, num_slots, nchunks):
+        """Per-chunk histograms over contiguous ranges, reduced by the caller."""
+        n = op_type.size
+        chunk = (n + nchunks - 1) // nchunks
+        # Pad each slot row to a 64-byte multiple so threads never share a line
+        row = (num_slots + 15) // 16 * 16
+        op_counts = np.zeros((nchunks, NUM_OP_CODES), COUNT_DTYPE)
+        slot_counts = np.zeros((nchunks, row), COUNT_DTYPE)
+        overflow = np.zeros(nchunks, np.int64)
+        pow2 = _is_pow2(num_slots)
+        for t in numba.prange(nchunks):
+            start = t * chunk
+            end = min(start + chunk, n)
+            if pow2:
+                if _scan_range_pow2(op_type, slot, start, end, num_slots - 1,
+                                    op_counts[t], slot_counts[t]):
+                    overflow[t] = 1
+            else:
+                overflow[t] = _scan_range(op_type, slot, start, end, num_slots,
+                                          op_counts[t], slot_counts[t])
+        return op_counts, slot_counts, overflow
+
+
+def _scan_numpy(op_type, slot, num_slots):
+    """Vectorized scan, used without numba or when slots exceed num_slots."""
+    op_counts = np.bincount(op_type, minlength=NUM_OP_CODES)
+    alloc_slots = slot[op_type == OP_ALLOC]
+    slot_counts = np.bincount(alloc_slots, minlength=num_slots)
+    return (op_counts.astype(COUNT_DTYPE, copy=False),
+            slot_counts.astype(COUNT_DTYPE, copy=False))
+
+
+def scan_traces(trace, num_slots):
+    """
+    Histogram a trace in one traversal.
+
+    Returns (both COUNT_DTYPE):
+        op_counts:   Count of each op_type code (length NUM_OP_CODES)
+        slot_counts: Allocations per slot (length num_slots, or longer
+                     if the trace allocates slots at or beyond num_slots)
+    """
+    op_type = trace.op_type
+    slot = trace.slot
+
+    if numba is not None and op_type.size >= PARALLEL_SCAN_MIN:
+        op_counts, slot_counts, overflow = _scan_kernel_parallel(
+            op_type, slot, num_slots, numba.get_num_threads())
+        if not overflow.any():
+            return (op_counts.sum(axis=0, dtype=COUNT_DTYPE),
+                    slot_counts[:, :num_slots].sum(axis=0, dtype=COUNT_DTYPE))
+    elif anamnesis_scan is not None or numba is not None:
+        # Serial scan: prefer the ahead-of-time build, which has no JIT warmup
+        if anamnesis_scan is not None:
+            scan = anamnesis_scan.scan
+        else:
+            scan = _scan_kernel
+        op_counts, slot_counts, overflow = scan(op_type, slot, num_slots)
+        if not overflow:
+            return op_counts, slot_counts
+
+    # No numba, or slots beyond num_slots (rare: --num-slots doesn't match
+    # the pool): two vectorized passes, with a slot histogram that grows
+    return _scan_numpy(op_type, slot, num_slots)
+
+
+def scan_trace_files(traces, num_slots):
+    """
+    Histogram several traces one at a time, without merging them.
+
+    Totals across files are accumulated in int64, so only a single file
+    is bound by COUNT_DTYPE.
+    """
+    op_counts = np.zeros(NUM_OP_CODES, np.int64)
+    slot_counts = np.zeros(num_slots, np.int64)
+    for i, trace in enumerate(traces):
+        # Overlap reading the next file with scanning this one
+        if i + 1 < len(traces):
+            _prefetch_trace(traces[i + 1])
+        file_op_counts, file_slot_counts = scan_traces(trace, num_slots)
+        if file_slot_counts.size > slot_counts.size:
+            slot_counts = np.pad(
+                slot_counts, (0, file_slot_counts.size - slot_counts.size))
+        op_counts += file_op_counts
+        slot_counts[:file_slot_counts.size] += file_slot_counts
+    return op_counts, slot_counts
+
+
+def _warn_slot_overflow(overflow, num_slots):
+    """Report allocations of slots at or beyond num_slots on stderr."""
+    print(f"Warning: {overflow:,} allocations use slots >= "
+          f"--num-slots={num_slots}; they are counted, but H_norm is "
+          f"normalized by log2({num_slots}), so check --num-slots against "
+          f"the pool size", file=sys.stderr)
+
+
+def entropy_from_slot_counts(slot_counts, num_slots):
     """
     Compute normalized entropy of slot reuse patterns.
 
-    Analyzes the sequence of slot allocations to measure how uniformly
+    Takes the per-slot allocation histogram to measure how uniformly
     slots are being reused. High entropy = uniform reuse, low entropy =
     biased reuse (e.g., LIFO stack behavior).
 
@@ -98,21 +473,15 @@ def compute_reuse_entropy(entries, num_slots):
                 0 = deterministic (always same slot)
                 1 = maximum entropy (uniform distribution)
     """
-    # Build sequence of allocated slot indices
-    alloc_sequence = []
-    for entry in entries:
-        if entry['op_type'] == OP_ALLOC:
-            alloc_sequence.append(entry['slot'])
-
-    if not alloc_sequence:
+    total = slot_counts.sum()
+    if total == 0:
         return 0.0
 
-    # Compute empirical probability distribution
-    slot_counts = Counter(alloc_sequence)
-    probs = np.array(list(slot_counts.values())) / len(alloc_sequence)
-
-    # Shannon entropy
-    H = -np.sum(probs * np.log2(probs + 1e-10))
+    # Shannon entropy over slots actually used. With p = c / total,
+    # -sum(p log2 p) = log2(total) - sum(c log2 c) / total, which needs no
+    # epsilon for empty slots and no intermediate probability array.
+    used = slot_counts[slot_counts > 0].astype(np.float64)
+    H = np.log2(total) - np.dot(used, np.log2(used)) / total
 
     # Normalize by maximum possible entropy
     H_max = np.log2(num_slots)
@@ -121,12 +490,10 @@ def compute_reuse_entropy(entries, num_slots):
     return H_norm
 
 
-def analyze_operation_stats(entries):
-    """Compute operation statistics."""
-    op_counts = Counter(e['op_type'] for e in entries)
-
+def stats_from_op_counts(op_counts):
+    """Compute operation statistics from an op_type histogram."""
     stats = {
-        'total_ops': len(entries),
+        'total_ops': op_counts.sum(),
         'allocs': op_counts[OP_ALLOC],
         'releases': op_counts[OP_RELEASE],
         'gets': op_counts[OP_GET_VALID] + op_counts[OP_GET_STALE],
@@ -145,49 +512,152 @@ def analyze_operation_stats(entries):
     return stats
 
 
-def print_summary(trace_dir, entries, entropy, num_slots):
-    """Print analysis summary."""
-    stats = analyze_operation_stats(entries)
-
-    print("\n" + "=" * 70)
-    print(f"TRACE ANALYSIS: {trace_dir}")
-    print("=" * 70)
+@functools.lru_cache(maxsize=None)
+def compute_dir_summary(trace_dir, num_slots, io_uring=False):
+    """
+    Compute (entropy, op_counts) for a trace directory.
 
-    print(f"\nOperation Statistics:")
-    print(f"  Total operations: {stats['total_ops']:,}")
-    print(f"  Allocations:      {stats['allocs']:,} ({stats.get('alloc_pct', 0):.1f}%)")
-    print(f"  Releases:         {stats['releases']:,} ({stats.get('release_pct', 0):.1f}%)")
-    print(f"  Gets:             {stats['gets']:,}")
-    print(f"    ├─ Valid:       {stats['gets'] - stats['stale_gets']:,}")
-    print(f"    └─ Stale:       {stats['stale_gets']:,} ({stats.get('stale_rate', 0):.2f}%)")
-    print(f"  Validation fails: {stats['validation_fails']:,}")
+    Results are saved to CACHE_FILENAME inside the directory, keyed on
+    CACHE_VERSION, the slot count and each trace file's name, size and
+    mtime, so reruns over unchanged traces skip loading and scanning.
+    Returns None if the directory holds no trace entries. The returned
+    op_counts is read-only, since repeat calls share the same array.
+    """
+    trace_dir = Path(trace_dir)
+    cache_file = trace_dir / CACHE_FILENAME
 
-    print(f"\nSlot Reuse Entropy:")
-    print(f"  Normalized entropy: H_norm = {entropy:.4f}")
-    print(f"  Max possible:       H_max  = log2({num_slots}) = {np.log2(num_slots):.4f}")
+    trace_files = sorted(trace_dir.glob('trace_thread_*.bin'))
+    key = None
+    if trace_files:
+        file_stats = [(f.name, st.st_size, st.st_mtime_ns)
+                      for f, st in ((f, f.stat()) for f in trace_files)]
+        key = json.dumps([CACHE_VERSION, str(trace_dir), num_slots,
+                          file_stats])
+        try:
+            # Plain arrays only: a cache in a shared trace set must not be
+            # able to run code when loaded
+            with np.load(cache_file, allow_pickle=False) as cached:
+                if str(cached['key']) == key:
+                    print(f"Using cached analysis: {cache_file}")
+                    slot_overflow = int(cached['slot_overflow'])
+                    if slot_overflow:
+                        _warn_slot_overflow(slot_overflow, num_slots)
+                    op_counts = cached['op_counts']
+                    op_counts.setflags(write=False)
+                    return float(cached['entropy']), op_counts
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            pass  # Missing, stale-format or corrupt cache: rescan
+
+    traces = load_traces(trace_dir, io_uring=io_uring)
+    if not any(trace.size for trace in traces):
+        return None
+
+    op_counts, slot_counts = scan_trace_files(traces, num_slots)
+    entropy = entropy_from_slot_counts(slot_counts, num_slots)
+    slot_overflow = int(slot_counts[num_slots:].sum())
+    if slot_overflow:
+        _warn_slot_overflow(slot_overflow, num_slots)
+
+    # Write to a sibling temp file and rename it into place, so that a
+    # concurrent or interrupted run never sees a half-written cache
+    tmp_name = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=trace_dir, prefix=CACHE_FILENAME,
+                                         suffix='.tmp', delete=False) as f:
+            tmp_name = f.name
+            np.savez(f, key=np.array(key), entropy=np.float64(entropy),
+                     op_counts=op_counts, slot_overflow=np.int64(slot_overflow))
+        os.replace(tmp_name, cache_file)
+    except OSError:
+        # Read-only trace directory: keep the in-process cache only
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+    op_counts.setflags(write=False)
+    return entropy, op_counts
+
+
+def compute_reuse_entropy(trace, num_slots):
+    """Compute normalized slot reuse entropy of a trace."""
+    _, slot_counts = scan_traces(trace, num_slots)
+    slot_overflow = int(slot_counts[num_slots:].sum())
+    if slot_overflow:
+        _warn_slot_overflow(slot_overflow, num_slots)
+    return entropy_from_slot_counts(slot_counts, num_slots)
+
+
+def analyze_operation_stats(trace):
+    """Compute operation statistics of a trace."""
+    op_counts = np.bincount(trace.op_type, minlength=NUM_OP_CODES)
+    return stats_from_op_counts(op_counts)
+
+
+def print_summary(trace_dir, stats, entropy, num_slots, h_max=None):
+    """Print analysis summary (h_max defaults to log2(num_slots))."""
+    if h_max is None:
+        h_max = np.log2(num_slots)
 
     # Interpret entropy
-    print(f"\nInterpretation:")
     if entropy > 0.9:
-        print("  → Nearly uniform slot reuse (high contention, random-like)")
+        interpretation = "  → Nearly uniform slot reuse (high contention, random-like)"
     elif entropy > 0.7:
-        print("  → Moderately uniform reuse")
+        interpretation = "  → Moderately uniform reuse"
     elif entropy > 0.4:
-        print("  → Biased reuse pattern")
+        interpretation = "  → Biased reuse pattern"
     else:
-        print("  → Highly biased reuse (low contention, LIFO-like)")
+        interpretation = "  → Highly biased reuse (low contention, LIFO-like)"
+
+    lines = [
+        "\n" + "=" * 70,
+        f"TRACE ANALYSIS: {trace_dir}",
+        "=" * 70,
+
+        "\nOperation Statistics:",
+        f"  Total operations: {stats['total_ops']:,}",
+        f"  Allocations:      {stats['allocs']:,} ({stats.get('alloc_pct', 0):.1f}%)",
+        f"  Releases:         {stats['releases']:,} ({stats.get('release_pct', 0):.1f}%)",
+        f"  Gets:             {stats['gets']:,}",
+        f"    ├─ Valid:       {stats['gets'] - stats['stale_gets']:,}",
+        f"    └─ Stale:       {stats['stale_gets']:,} ({stats.get('stale_rate', 0):.2f}%)",
+        f"  Validation fails: {stats['validation_fails']:,}",
+
+        "\nSlot Reuse Entropy:",
+        f"  Normalized entropy: H_norm = {entropy:.4f}",
+        f"  Max possible:       H_max  = log2({num_slots}) = {h_max:.4f}",
+
+        "\nInterpretation:",
+        interpretation,
+    ]
 
     # Check for k* hypothesis
     K_STAR = 1.0 / (2.0 * np.log(2.0))
     if abs(entropy - K_STAR) < 0.05:
-        print(f"\n  ⚠️  Entropy near k* = {K_STAR:.4f} — possible phase transition!")
+        lines.append(f"\n  ⚠️  Entropy near k* = {K_STAR:.4f} — possible phase transition!")
 
+    # One write per summary instead of one per line
+    sys.stdout.write("\n".join(lines) + "\n")
 
-def plot_results(trace_dirs, entropies, contention_levels):
-    """Plot entropy vs contention with k* reference line."""
+
+@functools.lru_cache(maxsize=None)
+def _import_pyplot():
+    """Import pyplot once, on the headless Agg backend unless already set up."""
     try:
+        if 'matplotlib' not in sys.modules:
+            import matplotlib
+            matplotlib.use('Agg')
         import matplotlib.pyplot as plt
     except ImportError:
+        return None
+    return plt
+
+
+def plot_results(trace_dirs, entropies, contention_levels):
+    """Plot entropy vs contention with k* reference line."""
+    plt = _import_pyplot()
+    if plt is None:
         print("\nWarning: matplotlib not available, skipping plot")
         return
 
@@ -210,7 +680,8 @@ def plot_results(trace_dirs, entropies, contention_levels):
     output_pdf = 'entropy_vs_contention.pdf'
     output_png = 'entropy_vs_contention.png'
     plt.savefig(output_pdf, dpi=300)
-    plt.savefig(output_png, dpi=300)
+    plt.savefig(output_png, dpi=300, pil_kwargs={'optimize': True})
+    plt.close()
 
     print(f"\n📊 Plots saved:")
     print(f"  {output_pdf}")
@@ -226,27 +697,38 @@ def main():
                         help='Generate entropy vs contention plot')
     parser.add_argument('--multi', action='store_true',
                         help='Analyze multiple trace directories (trace_c1, trace_c2, ...)')
+    parser.add_argument('--io-uring', action='store_true',
+                        help='Read trace files with batched io_uring reads (needs liburing)')
 
     args = parser.parse_args()
 
     if args.multi:
         # Analyze multiple contention levels
         base_dir = Path(args.trace_dir)
+        h_max = np.log2(args.num_slots)
         results = []
 
-        for contention in [1, 2, 4, 8, 16, 32, 64]:
+        contentions = [1, 2, 4, 8, 16, 32, 64]
+        # The bar redraws on stderr, so only show it when the per-level
+        # reports on stdout are not sharing the same terminal
+        if tqdm is not None and sys.stderr.isatty() and not sys.stdout.isatty():
+            contentions = tqdm(contentions, desc='Contention levels')
+
+        for contention in contentions:
             trace_dir = base_dir / f'traces_c{contention}'
             if not trace_dir.exists():
                 print(f"Skipping {trace_dir} (not found)")
                 continue
 
             print(f"\nProcessing contention level {contention}...")
-            entries = merge_traces(trace_dir)
-            if not entries:
+            summary = compute_dir_summary(trace_dir, args.num_slots,
+                                          io_uring=args.io_uring)
+            if summary is None:
                 continue
 
-            entropy = compute_reuse_entropy(entries, args.num_slots)
-            print_summary(trace_dir, entries, entropy, args.num_slots)
+            entropy, op_counts = summary
+            stats = stats_from_op_counts(op_counts)
+            print_summary(trace_dir, stats, entropy, args.num_slots, h_max)
 
             results.append({
                 'contention': contention,
@@ -262,12 +744,14 @@ def main():
 
     else:
         # Single trace directory
-        entries = merge_traces(args.trace_dir)
-        if not entries:
+        summary = compute_dir_summary(args.trace_dir, args.num_slots,
+                                      io_uring=args.io_uring)
+        if summary is None:
             return 1
 
-        entropy = compute_reuse_entropy(entries, args.num_slots)
-        print_summary(args.trace_dir, entries, entropy, args.num_slots)
+        entropy, op_counts = summary
+        stats = stats_from_op_counts(op_counts)
+        print_summary(args.trace_dir, stats, entropy, args.num_slots)
 
     return 0
 
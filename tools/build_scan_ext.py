@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Build the Anamnesis trace scan extension
+
+Compiles the serial scan kernel from analyze_traces.py ahead of time with
+numba.pycc, producing a native anamnesis_scan module next to this script.
+analyze_traces.py imports it when present, so short runs (e.g. --multi
+over small traces) skip JIT compilation entirely and need no numba at
+runtime. The module records SCAN_KERNEL_VERSION and the COUNT_DTYPE
+width, and analyze_traces.py ignores it once either no longer matches;
+rerun this script after changing the kernel or COUNT_DTYPE.
+
+Usage:
+    python build_scan_ext.py
+"""
+
+from pathlib import Path
+import sys
+
+try:
+    from numba.pycc import CC
+except ImportError:
+    print("Error: building the scan extension requires numba", file=sys.stderr)
+    sys.exit(1)
+
+import analyze_traces
+
+# (op_counts, slot_counts, overflow) = scan(op_type, slot, num_slots)
+COUNT_ITEMSIZE = analyze_traces.np.dtype(analyze_traces.COUNT_DTYPE).itemsize
+COUNT_TYPE = f"i{COUNT_ITEMSIZE}"
+SCAN_SIGNATURE = (f'Tuple(({COUNT_TYPE}[:], {COUNT_TYPE}[:], i8))'
+                  f'(u1[:], u4[:], i8)')
+
+SCAN_KERNEL_VERSION = analyze_traces.SCAN_KERNEL_VERSION
+
+
+def kernel_version():
+    """Kernel version the module was built from."""
+    return SCAN_KERNEL_VERSION
+
+
+def count_itemsize():
+    """Byte width of the histogram bins the module returns."""
+    return COUNT_ITEMSIZE
+
+
+def main():
+    cc = CC('anamnesis_scan')
+    cc.output_dir = str(Path(__file__).resolve().parent)
+    cc.export('scan', SCAN_SIGNATURE)(analyze_traces._scan_kernel.py_func)
+    cc.export('kernel_version', 'i8()')(kernel_version)
+    cc.export('count_itemsize', 'i8()')(count_itemsize)
+    cc.compile()
+
+    print(f"Built {cc.output_file} in {cc.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())